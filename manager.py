@@ -1,10 +1,22 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import os
+import time
+import sys
+import signal
 import argparse
-from colorama import init, Fore, Style
-init(autoreset=True)  # Initialize colorama
+import importlib.util
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+# Raw ANSI colors; colorama's stdout wrapper is only needed to translate them on Windows
+if os.name == 'nt':
+    from colorama import init
+    init(autoreset=True)  # Initialize colorama
+if sys.stdout.isatty():
+    GREEN, RED, YELLOW, CYAN, RESET = '\x1b[32m', '\x1b[31m', '\x1b[33m', '\x1b[36m', '\x1b[0m'
+else:
+    GREEN = RED = YELLOW = CYAN = RESET = ''
 
 try:
     import yfinance as yf
@@ -12,295 +24,535 @@ try:
 except ImportError:
     YFINANCE_AVAILABLE = False
 
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# asyncio and aiohttp add ~100 ms to startup and are only used to retry failed tickers,
+# so only look for aiohttp here and import both on first use
+AIOHTTP_AVAILABLE = importlib.util.find_spec('aiohttp') is not None
+asyncio = aiohttp = None
+
+def _load_async_modules():
+    """Import asyncio and aiohttp into the module namespace the first time they are needed"""
+    global asyncio, aiohttp
+    if aiohttp is None:
+        import asyncio
+        import aiohttp
+
+def write_lines(lines):
+    """Write a block of output lines with a single call to stdout"""
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+# Color templates for format_money, built once instead of on every call
+_MONEY_POSITIVE = f"{GREEN}{{:.2f}}{RESET}"
+_MONEY_POSITIVE_PLUS = f"{GREEN}+{{:.2f}}{RESET}"
+_MONEY_NEGATIVE = f"{RED}{{:.2f}}{RESET}"
+
 def format_money(amount, include_plus=False):
     """Format money values with color based on positive/negative"""
     if amount > 0:
-        return f"{Fore.GREEN}{'+' if include_plus else ''}{amount:.2f}{Style.RESET_ALL}"
+        return (_MONEY_POSITIVE_PLUS if include_plus else _MONEY_POSITIVE).format(amount)
     elif amount < 0:
-        return f"{Fore.RED}{amount:.2f}{Style.RESET_ALL}"
+        return _MONEY_NEGATIVE.format(amount)
     return f"{amount:.2f}"
 
+COLUMNS = ['symbol', 'type', 'date', 'qty', 'price', 'total']
+TYPE_DTYPE = pd.CategoricalDtype(['BUY', 'SELL'])
+DTYPES = {
+    'symbol': 'category',
+    'type': TYPE_DTYPE,
+    'date': 'datetime64[ns]',
+    'qty': 'int32',
+    # Money stays float64: float32 cannot hold cents above ~$131k
+    'price': 'float64',
+    'total': 'float64'
+}
+MAX_QUANTITY = np.iinfo(np.int32).max
+# Optional column holding the original text of legacy dates that could not be parsed
+RAW_DATE_COLUMN = 'raw_date'
+# Parse types for CSV reads; symbol/type/date are converted after the chunks are joined
+CSV_DTYPES = {
+    'symbol': 'str',
+    'type': 'str',
+    'date': 'str',
+    'qty': 'int64',  # narrowed to int32 after the range check in _prepare_df
+    'price': 'float64',
+    'total': 'float64'
+}
+CSV_CHUNK_SIZE = 100_000
+FILE_FORMATS = ['csv', 'feather', 'parquet']
+MAX_FETCH_WORKERS = 16
+PRICE_CACHE_TTL = 60  # seconds
+FLUSH_EVERY = 10  # buffered transactions written to disk at a time
+CHART_URL = 'https://query1.finance.yahoo.com/v8/finance/chart/{}?range=1d&interval=1d'
+HTTP_TIMEOUT = 10  # seconds
+
 class PortfolioManager:
-    def __init__(self, csv_file='portfolio.csv', offline_mode=False):
-        self.csv_file = csv_file
+    def __init__(self, data_file=None, offline_mode=False, file_format=None, csv_file=None):
+        # csv_file is the keyword older versions used for the data file
+        data_file = data_file or csv_file
+        if file_format is None:
+            extension = os.path.splitext(data_file)[1].lstrip('.') if data_file else ''
+            if extension in FILE_FORMATS:
+                file_format = extension
+            else:
+                file_format = 'feather' if PYARROW_AVAILABLE else 'csv'
+        self.file_format = file_format
+        self.data_file = data_file or f'portfolio.{file_format}'
         self.offline_mode = offline_mode
+        self._price_cache = {}  # symbol -> (fetch time, price or None if the fetch failed)
+        self._pending = []  # rows added since the last merge into self.df
+        self._dirty = False  # True while there are transactions not yet written to disk
         self.df = self._load_or_create_df()
 
     def _load_or_create_df(self):
-        """Load existing CSV or create new DataFrame with proper structure"""
-        if os.path.exists(self.csv_file):
-            df = pd.read_csv(self.csv_file)
-            # Replace NaN with empty string for string columns, 0 for numeric columns
-            for col in df.columns:
-                if 'type' in col or 'date' in col:
-                    df[col] = df[col].fillna('')
-                else:
-                    df[col] = df[col].fillna(0)
+        """Load existing data file or create new DataFrame with one row per transaction"""
+        base = os.path.splitext(self.data_file)[0]
+        legacy_csv = f'{base}.csv'
+        if os.path.exists(self.data_file):
+            self._warn_other_formats(base)
+            return self._prepare_df(self._read_df(self.data_file, self.file_format))
+        elif self.file_format != 'csv' and os.path.exists(legacy_csv):
+            # First run with a binary format: import the old CSV once, write it out, and
+            # move the CSV aside so there is only one live copy of the data
+            df = self._prepare_df(self._read_df(legacy_csv, 'csv'))
+            self._write_df(df)
+            os.replace(legacy_csv, f'{legacy_csv}.migrated')
+            print(f"{YELLOW}Imported {legacy_csv} into {self.data_file}; "
+                  f"the CSV was renamed to {legacy_csv}.migrated.{RESET}")
             return df
         else:
-            initial_columns = ['symbol']
-            for i in range(1, 6):
-                initial_columns.extend(self._get_transaction_columns(i))
-            return pd.DataFrame(columns=initial_columns)
-
-    def _get_transaction_columns(self, idx):
-        """Get column names for a transaction set"""
-        prefix = f't{idx}_'
-        return [
-            f'{prefix}type',
-            f'{prefix}date',
-            f'{prefix}qty',
-            f'{prefix}price',
-            f'{prefix}total'
-        ]
-
-    def _extend_columns_if_needed(self, needed_transactions):
-        """Extend DataFrame columns if more transaction slots are needed"""
-        current_transactions = (len(self.df.columns) - 1) // 5
-        if needed_transactions > current_transactions:
-            new_columns = []
-            for i in range(current_transactions + 1, needed_transactions + 1):
-                new_columns.extend(self._get_transaction_columns(i))
-            for col in new_columns:
-                if 'type' in col or 'date' in col:
-                    self.df[col] = ''
-                else:
-                    self.df[col] = 0
+            self._warn_other_formats(base)
+            return pd.DataFrame(columns=COLUMNS).astype(DTYPES)
+
+    def _warn_other_formats(self, base):
+        """Warn when the same portfolio also exists in another storage format"""
+        others = [f'{base}.{fmt}' for fmt in FILE_FORMATS
+                  if fmt != self.file_format and os.path.exists(f'{base}.{fmt}')]
+        if others:
+            print(f"{YELLOW}Also found {', '.join(others)}; using {self.data_file}. "
+                  f"Pass --format to choose another file.{RESET}")
+
+    def _read_df(self, path, file_format):
+        """Read a DataFrame from disk in the given format"""
+        if file_format == 'feather':
+            return pd.read_feather(path)
+        elif file_format == 'parquet':
+            return pd.read_parquet(path)
+        return self._read_csv(path)
+
+    def _read_csv(self, path):
+        """Read a CSV in chunks with fixed dtypes and no missing-value detection"""
+        header = pd.read_csv(path, nrows=0).columns
+        if 't1_type' in header:
+            # Legacy wide files have empty transaction slots; only those may be NaN, so a
+            # ticker such as 'NA' is kept as a symbol
+            slot_columns = [col for col in header if col != 'symbol']
+            return pd.read_csv(path, dtype={'symbol': 'str'}, keep_default_na=False,
+                               na_values={col: [''] for col in slot_columns})
+        chunks = pd.read_csv(path, dtype=CSV_DTYPES, na_filter=False, chunksize=CSV_CHUNK_SIZE)
+        return pd.concat(chunks, ignore_index=True)
+
+    def _prepare_df(self, df):
+        """Bring a loaded DataFrame to the long layout and expected dtypes"""
+        if 't1_type' in df.columns:
+            df = self._from_wide(df)
+        has_raw_dates = RAW_DATE_COLUMN in df.columns
+        df = df[COLUMNS + [RAW_DATE_COLUMN]] if has_raw_dates else df[COLUMNS]
+        if df['date'].dtype != DTYPES['date']:
+            raw = df['date'].astype(object).where(df['date'].notna(), '').astype(str).str.strip()
+            parsed = pd.to_datetime(raw.replace('', None), format='mixed', errors='coerce')
+            # Text without a year (e.g. 'Jan 5th') can parse to year 1, outside datetime64[ns]
+            parsed = parsed.where((parsed >= pd.Timestamp.min) & (parsed <= pd.Timestamp.max))
+            failed = parsed.isna() & (raw != '')
+            df = df.assign(date=parsed)
+            if failed.any():
+                # Keep dates older versions accepted but that cannot be parsed, so saving doesn't lose them
+                print(f"{YELLOW}{failed.sum()} transaction date(s) could not be parsed; "
+                      f"their original text is kept and shown instead.{RESET}")
+                raw_dates = df[RAW_DATE_COLUMN] if has_raw_dates else pd.Series('', index=df.index)
+                df = df.assign(**{RAW_DATE_COLUMN: raw_dates.where(~failed, raw)})
+                has_raw_dates = True
+        # Files written before qty became int32 may hold larger counts; casting would wrap them
+        dtypes = DTYPES
+        if pd.to_numeric(df['qty']).abs().max() > MAX_QUANTITY:
+            dtypes = {**DTYPES, 'qty': 'int64'}
+        df = df.astype(dtypes)
+        if has_raw_dates:
+            df[RAW_DATE_COLUMN] = df[RAW_DATE_COLUMN].fillna('').astype(str)
+        return df
+
+    def _from_wide(self, df):
+        """Convert a legacy CSV with t1_..tN_ columns per stock into one row per transaction"""
+        num_slots = sum(1 for col in df.columns if col.endswith('_type'))
+        # One (stocks x slots) array per field, so all filled slots are found in a single mask
+        fields = {
+            col: df[[f't{i}_{col}' for i in range(1, num_slots + 1)]].to_numpy()
+            for col in COLUMNS[1:]
+        }
+        types = fields['type']
+        filled = ~pd.isna(types) & (types != '')
+        rows = np.nonzero(filled)[0]
+        return pd.DataFrame({
+            'symbol': df['symbol'].to_numpy()[rows],
+            **{col: values[filled] for col, values in fields.items()}
+        })
 
     def add_transaction(self, symbol, trans_type, quantity, price, date=None):
         """Add a new stock transaction"""
+        # Check every field before buffering, so one bad row cannot break the merge of the rest
+        if not isinstance(symbol, str) or not symbol:
+            raise ValueError("Symbol must be a non-empty string")
+        trans_type = trans_type.upper()
+        if trans_type not in TYPE_DTYPE.categories:
+            raise ValueError(f"Transaction type must be BUY or SELL, not {trans_type!r}")
+        quantity = int(quantity)
+        if abs(quantity) > MAX_QUANTITY:
+            raise ValueError(f"Quantity must be at most {MAX_QUANTITY:,} shares")
+        price = float(price)
+        if not np.isfinite(price):
+            raise ValueError("Price must be a finite number")
         if date is None:
-            date = datetime.now().strftime("%Y-%m-%d")
+            date = pd.Timestamp.today().normalize()
+        # Convert now so a date outside datetime64[ns] (e.g. 1500-01-01) is rejected here
+        # with OutOfBoundsDatetime, a ValueError, instead of breaking the buffered merge
+        date = pd.Timestamp(date).as_unit('ns')
         
-        total = round(quantity * price * (-1 if trans_type.lower() == 'buy' else 1), 2)
+        # Keep full precision; values are formatted to 2 decimals when displayed
+        total = quantity * price * (-1 if trans_type == 'BUY' else 1)
         
-        stock_row = self.df[self.df['symbol'] == symbol]
-        if len(stock_row) == 0:
-            new_row = {'symbol': symbol}
-            for i in range(1, 6):
-                prefix = f't{i}_'
-                new_row.update({
-                    f'{prefix}type': '',
-                    f'{prefix}date': '',
-                    f'{prefix}qty': 0,
-                    f'{prefix}price': 0,
-                    f'{prefix}total': 0
-                })
-            new_row.update({
-                't1_type': trans_type.upper(),
-                't1_date': date,
-                't1_qty': int(quantity),
-                't1_price': price,
-                't1_total': total
-            })
-            self.df = pd.concat([self.df, pd.DataFrame([new_row])], ignore_index=True)
-        else:
-            row_idx = stock_row.index[0]
-            transaction_num = 1
-            while True:
-                col_type = f't{transaction_num}_type'
-                if col_type not in self.df.columns:
-                    self._extend_columns_if_needed(transaction_num)
-                
-                if pd.isna(self.df.at[row_idx, col_type]) or self.df.at[row_idx, col_type] == '':
-                    self.df.at[row_idx, f't{transaction_num}_type'] = trans_type.upper()
-                    self.df.at[row_idx, f't{transaction_num}_date'] = date
-                    self.df.at[row_idx, f't{transaction_num}_qty'] = int(quantity)
-                    self.df.at[row_idx, f't{transaction_num}_price'] = price
-                    self.df.at[row_idx, f't{transaction_num}_total'] = total
-                    break
-                transaction_num += 1
+        new_row = {
+            'symbol': symbol,
+            'type': trans_type,
+            'date': date,
+            'qty': quantity,
+            'price': price,
+            'total': total
+        }
+        # Buffer the row; appending to self.df one row at a time copies the whole frame
+        self._pending.append(new_row)
+        self._dirty = True
+        # Bound how many trades a crash can lose
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+        print(f"\nTransaction added successfully: {symbol} - {trans_type} {quantity} shares at ${price:.2f} (Total: ${format_money(total)})")
 
-        self._save_to_csv()
-        print(f"\nTransaction added successfully: {symbol} - {trans_type} {int(quantity)} shares at ${price:.2f} (Total: ${format_money(total)})")
+    def _merge_pending(self):
+        """Append buffered transactions to the DataFrame in a single concat"""
+        if self._pending:
+            new_df = pd.DataFrame(self._pending, columns=COLUMNS).astype(DTYPES)
+            # concat only keeps the categorical dtype when both sides share categories
+            symbols = self.df['symbol'].cat
+            new_symbols = new_df['symbol'].cat.categories.difference(symbols.categories)
+            if len(new_symbols):
+                self.df['symbol'] = symbols.add_categories(new_symbols)
+            new_df['symbol'] = new_df['symbol'].cat.set_categories(self.df['symbol'].cat.categories)
+            self.df = pd.concat([self.df, new_df], ignore_index=True)
+            if RAW_DATE_COLUMN in self.df.columns:
+                self.df[RAW_DATE_COLUMN] = self.df[RAW_DATE_COLUMN].fillna('')
+            self._pending.clear()
 
-    def _save_to_csv(self):
-        """Save the current DataFrame to CSV"""
-        self.df.to_csv(self.csv_file, index=False)
+    def flush(self):
+        """Merge buffered transactions and save the DataFrame if anything changed"""
+        if not self._dirty:
+            return
+        self._merge_pending()
+        self._write_df(self.df)
+        self._dirty = False
+
+    def _write_df(self, df):
+        """Write a DataFrame to the data file in the configured format"""
+        if self.file_format == 'feather':
+            df.to_feather(self.data_file)
+        elif self.file_format == 'parquet':
+            df.to_parquet(self.data_file, index=False)
+        else:
+            df.to_csv(self.data_file, index=False)
 
     def _get_current_prices(self, symbols):
         """Get current market prices for a list of symbols"""
-        if not YFINANCE_AVAILABLE or self.offline_mode:
+        if not YFINANCE_AVAILABLE or self.offline_mode or not symbols:
             return {}
-        
+
+        # Reuse quotes fetched within the last PRICE_CACHE_TTL seconds; a cached None marks
+        # a symbol that failed, so invalid tickers are not re-requested on every summary
+        now = time.monotonic()
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            cached = self._price_cache.get(symbol)
+            if cached is None or now - cached[0] >= PRICE_CACHE_TTL:
+                missing.append(symbol)
+            elif cached[1] is not None:
+                prices[symbol] = cached[1]
+
+        if missing:
+            fetched = self._fetch_prices(missing)
+            for symbol in missing:
+                self._price_cache[symbol] = (now, fetched.get(symbol))
+            prices.update(fetched)
+        return prices
+
+    def _fetch_prices(self, symbols):
+        """Fetch market prices from Yahoo Finance for a non-empty list of symbols"""
+        # yfinance returns a flat frame for a single ticker, so query it directly
+        if len(symbols) == 1:
+            symbol, price = self._fetch_price(symbols[0])
+            return {} if price is None else {symbol: price}
+
+        try:
+            data = yf.download(' '.join(symbols), period='1d', progress=False,
+                               group_by='ticker', threads=True)
+        except Exception:
+            return self._fetch_prices_concurrently(symbols)
+
         prices = {}
         for symbol in symbols:
             try:
-                ticker = yf.Ticker(symbol)
-                ticker_data = ticker.history(period='1d')
-                if not ticker_data.empty:
-                    current_price = ticker_data['Close'].iloc[-1]
-                    prices[symbol] = current_price
-            except Exception:
+                closes = data[symbol]['Close'].dropna()
+                if not closes.empty:
+                    prices[symbol] = closes.iloc[-1]
+            except KeyError:
                 pass
+
+        # yfinance logs per-ticker failures instead of raising, so retry whatever is missing
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            prices.update(self._fetch_prices_concurrently(missing))
         return prices
 
+    def _fetch_prices_concurrently(self, symbols):
+        """Fetch prices one ticker per request, via aiohttp if installed, else a thread pool"""
+        if AIOHTTP_AVAILABLE:
+            _load_async_modules()
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # No event loop in this thread, so asyncio.run can start one
+                return asyncio.run(self._fetch_prices_async(symbols))
+
+        # Without aiohttp, or when called from inside a running event loop, use threads
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(symbols))) as executor:
+            results = executor.map(self._fetch_price, symbols)
+            return {symbol: price for symbol, price in results if price is not None}
+
+    async def _fetch_prices_async(self, symbols):
+        """Request every symbol from Yahoo's chart endpoint over one aiohttp session"""
+        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+            results = await asyncio.gather(*(self._fetch_price_async(session, symbol)
+                                             for symbol in symbols))
+        return {symbol: price for symbol, price in results if price is not None}
+
+    async def _fetch_price_async(self, session, symbol):
+        """Fetch the latest market price for one symbol, or None if unavailable"""
+        try:
+            async with session.get(CHART_URL.format(quote(symbol))) as response:
+                response.raise_for_status()
+                data = await response.json()
+            return symbol, float(data['chart']['result'][0]['meta']['regularMarketPrice'])
+        except Exception:
+            return symbol, None
+
+    def _fetch_price(self, symbol):
+        """Fetch the latest closing price for one symbol, or None if unavailable"""
+        try:
+            ticker_data = yf.Ticker(symbol).history(period='1d')
+            if not ticker_data.empty:
+                return symbol, ticker_data['Close'].iloc[-1]
+        except Exception:
+            pass
+        return symbol, None
+
+    def _aggregate_positions(self):
+        """Total shares held and P&L per symbol, in order of first appearance"""
+        df = self.df
+        # Widen before summing so position totals cannot overflow int32
+        qty = df['qty'].to_numpy(dtype=np.int64)
+        signed_qty = np.where(df['type'] == 'BUY', qty, -qty)
+        return (df.assign(signed_qty=signed_qty)
+                  .groupby('symbol', sort=False, observed=True)
+                  .agg(shares=('signed_qty', 'sum'), pnl=('total', 'sum')))
+
     def get_portfolio_summary(self):
         """Generate a summary of current portfolio positions and closed positions"""
-        print(f"\n{Fore.CYAN}=== PORTFOLIO SUMMARY ==={Style.RESET_ALL}")
+        print(f"\n{CYAN}=== PORTFOLIO SUMMARY ==={RESET}")
         print("-" * 70)
         
+        self._merge_pending()
+        grp = self._aggregate_positions()
+        is_active = (grp['shares'] != 0).to_numpy()
+
+        # grp has one row per symbol, so there is no need to scan the transaction column
         if not self.offline_mode and YFINANCE_AVAILABLE:
-            print(f"{Fore.YELLOW}Fetching market data...{Style.RESET_ALL}")
-            current_prices = self._get_current_prices(self.df['symbol'].tolist())
+            print(f"{YELLOW}Fetching market data...{RESET}")
+            current_prices = self._get_current_prices(grp.index[is_active].tolist())
         else:
             current_prices = {}
 
-        active_positions = []
-        closed_positions = []
-        
-        for _, row in self.df.iterrows():
-            symbol = row['symbol']
-            total_shares = 0
-            total_pnl = 0
-            
-            transaction_num = 1
-            while f't{transaction_num}_type' in row:
-                prefix = f't{transaction_num}_'
-                if row[f'{prefix}type'] != '':
-                    try:
-                        qty = int(row[f'{prefix}qty'])
-                        if row[f'{prefix}type'] == 'BUY':
-                            total_shares += qty
-                        else:
-                            total_shares -= qty
-                        total_pnl += float(row[f'{prefix}total'])
-                    except (ValueError, TypeError):
-                        continue
-                transaction_num += 1
-
-            position_info = {
-                'symbol': symbol,
-                'shares': total_shares,
-                'pnl': total_pnl
-            }
-
-            if total_shares != 0:
-                if symbol in current_prices:
-                    current_price = current_prices[symbol]
-                    market_value = total_shares * current_price
-                    position_info['market_value'] = market_value
-                    position_info['current_price'] = current_price
-                    # Calculate gain (market value + pnl = gain)
-                    position_info['gain'] = market_value + total_pnl
-                active_positions.append(position_info)
-            else:
-                closed_positions.append(position_info)
+        # Symbols without a quote get NaN, which carries through market value and gain
+        grp['current_price'] = grp.index.map(current_prices).astype(np.float64)
+        grp['market_value'] = grp['shares'] * grp['current_price']
+        # Calculate gain (market value + pnl = gain)
+        grp['gain'] = grp['market_value'] + grp['pnl']
+
+        active_positions = grp[is_active]
+        closed_positions = grp[~is_active]
+
+        # Bind globals and attributes used in the display loops to locals once
+        yellow, reset, fmt = YELLOW, RESET, format_money
+        isnan = np.isnan
+        separator = "-" * 30
 
         # Display active positions
-        print(f"\n{Fore.CYAN}=== ACTIVE POSITIONS ==={Style.RESET_ALL}")
-        print("-" * 70)
-        total_pnl = 0
-        total_market_value = 0
-        
-        for pos in active_positions:
-            print(f"\n{Fore.YELLOW}Stock: {pos['symbol']}{Style.RESET_ALL}")
-            print(f"Current Position: {pos['shares']} shares")
-            print(f"Total P&L: ${format_money(pos['pnl'])}")
-            if 'market_value' in pos:
-                print(f"Current Price: ${pos['current_price']:.2f}")
-                print(f"Current Market Value: ${pos['market_value']:.2f}")
-                print(f"Gain: ${format_money(pos['gain'], include_plus=True)}")
-            print("-" * 30)
-            total_pnl += pos['pnl']
-            if 'market_value' in pos:
-                total_market_value += pos['market_value']
+        lines = [f"\n{CYAN}=== ACTIVE POSITIONS ==={RESET}", "-" * 70]
+        add = lines.append
+        for pos in active_positions.itertuples():
+            add(f"\n{yellow}Stock: {pos.Index}{reset}")
+            add(f"Current Position: {pos.shares} shares")
+            add(f"Total P&L: ${fmt(pos.pnl)}")
+            if not isnan(pos.market_value):
+                add(f"Current Price: ${pos.current_price:.2f}")
+                add(f"Current Market Value: ${pos.market_value:.2f}")
+                add(f"Gain: ${fmt(pos.gain, include_plus=True)}")
+            add(separator)
+        write_lines(lines)
+        total_pnl = active_positions['pnl'].sum()
+        total_market_value = active_positions['market_value'].sum()
 
         # Display closed positions
-        print(f"\n{Fore.CYAN}=== CLOSED POSITIONS ==={Style.RESET_ALL}")
-        print("-" * 70)
-        closed_total_pnl = 0
-        
-        for pos in closed_positions:
-            print(f"\n{Fore.YELLOW}Stock: {pos['symbol']}{Style.RESET_ALL}")
-            print(f"P&L: ${format_money(pos['pnl'])}")
-            print("-" * 30)
-            closed_total_pnl += pos['pnl']
+        lines = [f"\n{CYAN}=== CLOSED POSITIONS ==={RESET}", "-" * 70]
+        add = lines.append
+        for pos in closed_positions.itertuples():
+            add(f"\n{yellow}Stock: {pos.Index}{reset}")
+            add(f"P&L: ${fmt(pos.pnl)}")
+            add(separator)
+        write_lines(lines)
+        closed_total_pnl = closed_positions['pnl'].sum()
 
         # Display summary totals
-        print(f"\n{Fore.CYAN}=== PORTFOLIO TOTALS ==={Style.RESET_ALL}")
-        print("-" * 70)
-        print(f"Active Positions P&L: ${format_money(total_pnl)}")
+        lines = [f"\n{CYAN}=== PORTFOLIO TOTALS ==={RESET}", "-" * 70]
+        lines.append(f"Active Positions P&L: ${format_money(total_pnl)}")
         if total_market_value > 0:
-            print(f"Active Positions Market Value: ${total_market_value:.2f}")
-        print(f"Closed Positions P&L: ${format_money(closed_total_pnl)}")
-        print("-" * 70)
+            lines.append(f"Active Positions Market Value: ${total_market_value:.2f}")
+        lines.append(f"Closed Positions P&L: ${format_money(closed_total_pnl)}")
+        lines.append("-" * 70)
+        write_lines(lines)
 
     def view_all_transactions(self):
         """Display all transactions in a readable format"""
-        print(f"\n{Fore.CYAN}=== ALL TRANSACTIONS ==={Style.RESET_ALL}")
+        print(f"\n{CYAN}=== ALL TRANSACTIONS ==={RESET}")
         
-        for _, row in self.df.iterrows():
-            print(f"\n{Fore.YELLOW}Stock: {row['symbol']}{Style.RESET_ALL}")
-            
-            transaction_num = 1
-            while f't{transaction_num}_type' in row:
-                prefix = f't{transaction_num}_'
-                if row[f'{prefix}type'] != '':
-                    try:
-                        qty = int(row[f'{prefix}qty'])
-                        price = float(row[f'{prefix}price'])
-                        total = float(row[f'{prefix}total'])
-                        print(f"Transaction {transaction_num}: {row[f'{prefix}type']} "
-                              f"{qty} shares @ ${price:.2f} on {row[f'{prefix}date']} "
-                              f"(Total: ${format_money(total)})")
-                    except (ValueError, TypeError):
-                        continue
-                transaction_num += 1
-            print("-" * 50)
+        self._merge_pending()
+        # Dates are only turned into strings here, for display
+        dates = self.df['date'].dt.strftime('%Y-%m-%d')
+        if RAW_DATE_COLUMN in self.df.columns:
+            # Unparseable legacy dates are shown as they were originally entered
+            dates = dates.fillna(self.df[RAW_DATE_COLUMN].replace('', None))
+        df = self.df.assign(date=dates.fillna('unknown date'))
+        # Group each stock's rows by first appearance; the stable sort keeps trade order
+        order = np.argsort(pd.factorize(df['symbol'])[0], kind='stable')
+        rows = zip(*(df[col].to_numpy()[order] for col in COLUMNS))
+
+        # Bind globals and attributes used in the loop to locals once
+        yellow, reset, fmt = YELLOW, RESET, format_money
+        separator = "-" * 50
+        lines = []
+        add = lines.append
+        current_symbol = None
+        for symbol, trans_type, date, qty, price, total in rows:
+            if symbol != current_symbol:
+                if current_symbol is not None:
+                    add(separator)
+                add(f"\n{yellow}Stock: {symbol}{reset}")
+                current_symbol = symbol
+                transaction_num = 0
+            transaction_num += 1
+            add(f"Transaction {transaction_num}: {trans_type} "
+                f"{qty} shares @ ${price:.2f} on {date} "
+                f"(Total: ${fmt(total)})")
+        if current_symbol is not None:
+            add(separator)
+            write_lines(lines)
 
 def main():
     parser = argparse.ArgumentParser(description='Portfolio Manager')
     parser.add_argument('--offline', action='store_true', help='Run in offline mode (skip market data)')
+    parser.add_argument('--format', choices=FILE_FORMATS, default=None,
+                        help='Storage format for portfolio data (default: feather if pyarrow is installed, else csv)')
     args = parser.parse_args()
 
-    portfolio = PortfolioManager(offline_mode=args.offline)
+    file_format = args.format
+    if file_format in ('feather', 'parquet') and not PYARROW_AVAILABLE:
+        print(f"{YELLOW}pyarrow is not installed, falling back to CSV storage.{RESET}")
+        file_format = 'csv'
+
+    portfolio = PortfolioManager(offline_mode=args.offline, file_format=file_format)
     
-    while True:
-        print(f"\n{Fore.CYAN}=== PORTFOLIO MANAGER ==={Style.RESET_ALL}")
-        print("1. Add Transaction")
-        print("2. View Portfolio Summary")
-        print("3. View All Transactions")
-        print("4. Exit")
+    # Closing the terminal sends SIGHUP; exit normally so buffered transactions get saved
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: sys.exit(1))
+
+    try:
+        while True:
+            print(f"\n{CYAN}=== PORTFOLIO MANAGER ==={RESET}")
+            print("1. Add Transaction")
+            print("2. View Portfolio Summary")
+            print("3. View All Transactions")
+            print("4. Exit")
         
-        try:
-            choice = input("\nEnter your choice (1-4): ")
+            try:
+                choice = input("\nEnter your choice (1-4): ")
             
-            if choice == '1':
-                symbol = input("Enter stock symbol: ").upper()
-                trans_type = input("Enter transaction type (buy/sell): ").upper()
-                while trans_type not in ['BUY', 'SELL']:
-                    trans_type = input("Please enter 'BUY' or 'SELL': ").upper()
+                if choice == '1':
+                    symbol = input("Enter stock symbol: ").upper()
+                    trans_type = input("Enter transaction type (buy/sell): ").upper()
+                    while trans_type not in ['BUY', 'SELL']:
+                        trans_type = input("Please enter 'BUY' or 'SELL': ").upper()
                 
-                try:
-                    quantity = int(input("Enter quantity: "))
-                    price = float(input("Enter price per share: "))
-                    date = input("Enter date (YYYY-MM-DD, press Enter for today): ").strip()
-                    if date:
-                        portfolio.add_transaction(symbol, trans_type, quantity, price, date)
-                    else:
-                        portfolio.add_transaction(symbol, trans_type, quantity, price)
-                except ValueError:
-                    print(f"{Fore.RED}Invalid input. Please enter numeric values for quantity and price.{Style.RESET_ALL}")
+                    try:
+                        quantity = int(input("Enter quantity: "))
+                        if abs(quantity) > MAX_QUANTITY:
+                            print(f"{RED}Quantity too large. Please enter at most {MAX_QUANTITY:,} shares.{RESET}")
+                            continue
+                        price = float(input("Enter price per share: "))
+                        date = input("Enter date (YYYY-MM-DD, press Enter for today): ").strip()
+                        if date:
+                            try:
+                                date = pd.to_datetime(date, format='%Y-%m-%d').as_unit('ns')
+                            except ValueError:
+                                print(f"{RED}Invalid date. Please enter a YYYY-MM-DD date between 1678 and 2261.{RESET}")
+                                continue
+                            portfolio.add_transaction(symbol, trans_type, quantity, price, date)
+                        else:
+                            portfolio.add_transaction(symbol, trans_type, quantity, price)
+                    except ValueError:
+                        print(f"{RED}Invalid input. Please enter numeric values for quantity and price.{RESET}")
                     
-            elif choice == '2':
-                portfolio.get_portfolio_summary()
+                elif choice == '2':
+                    portfolio.get_portfolio_summary()
                 
-            elif choice == '3':
-                portfolio.view_all_transactions()
+                elif choice == '3':
+                    portfolio.view_all_transactions()
                 
-            elif choice == '4':
-                print(f"\n{Fore.YELLOW}Exiting Portfolio Manager. Goodbye!{Style.RESET_ALL}")
-                break
+                elif choice == '4':
+                    print(f"\n{YELLOW}Exiting Portfolio Manager. Goodbye!{RESET}")
+                    break
                 
-            else:
-                print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
+                else:
+                    print(f"{RED}Invalid choice. Please try again.{RESET}")
                 
-        except EOFError:
-            break
-        except KeyboardInterrupt:
-            print(f"\n{Fore.YELLOW}Operation cancelled by user.{Style.RESET_ALL}")
-            break
+            except EOFError:
+                break
+            except KeyboardInterrupt:
+                print(f"\n{YELLOW}Operation cancelled by user.{RESET}")
+                break
+    finally:
+        portfolio.flush()
 
 if __name__ == "__main__":
     main()